@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+"""
+Indexes a vocabulary by the deletion neighbourhoods of its words and their consonant skeletons, such that all words
+within a given edit distance of a token are found with a few hash lookups [Garbe 2012, SymSpell]
+"""
+
+
+class DeletionIndex:
+
+    max_distance = 0
+
+    # Tokens up to this length are only matched within edit distance 1, as nearly every short word lies within 2
+    short_token_length = 4
+
+    # Skeletons are matched within a smaller distance and only from a minimal length on, since short skeletons
+    # collapse onto single consonants and would match almost every other word. Skeletons up to short_skeleton_length
+    # have to match exactly
+    skeleton_distance = 1
+    min_skeleton_length = 3
+    short_skeleton_length = 4
+
+    # Deletion variant -> words whose deletion neighbourhood contains it
+    word_deletes = {}
+    skeleton_deletes = {}
+
+    def __init__(self, word_list, max_distance):
+
+        """
+        Initialization
+        :param word_list: dictionary from first letters to words, as created by ExtractNgrams
+        :param max_distance: maximal edit distance between a token and its candidates
+        """
+
+        self.max_distance = max_distance
+        self.word_deletes = {}
+        self.skeleton_deletes = {}
+
+        # Only words that can be normalization targets are indexed, not punctuation or encoding debris
+        for key in word_list:
+            for word in word_list[key]:
+                if word.replace("'", "").isalnum():
+                    self.add_word(word)
+
+    def add_word(self, word):
+
+        """
+        Adds all deletion variants of a word and of its consonant skeleton to the index
+        :param word: the word to be added
+        """
+
+        for variant in self.deletes(word, self.max_distance):
+            self.word_deletes.setdefault(variant, set()).add(word)
+
+        skeleton = self.replace_vowels(word)
+
+        if len(skeleton) >= self.min_skeleton_length:
+            for variant in self.deletes(skeleton, self.skeleton_distance):
+                self.skeleton_deletes.setdefault(variant, set()).add(word)
+
+    def deletes(self, word, distance):
+
+        """
+        Creates the deletion neighbourhood of a word, i.e. all strings obtained by deleting up to distance characters
+        :param word: the word whose neighbourhood is created
+        :param distance: maximal number of deleted characters
+        :return: set of all deletion variants of word, including word itself
+        """
+
+        neighbourhood = {word}
+        current = {word}
+
+        for i in range(distance):
+
+            following = set()
+
+            for variant in current:
+                for j in range(len(variant)):
+                    following.add(variant[:j] + variant[j + 1:])
+
+            following -= neighbourhood
+            neighbourhood |= following
+            current = following
+
+        return neighbourhood
+
+    def candidates(self, token):
+
+        """
+        Finds the vocabulary words close to a token, either on the full forms or on the consonant skeletons.
+        Full forms are matched within max_distance, or within 1 if the token has at most short_token_length
+        characters. Skeletons are matched within skeleton_distance, exactly if the token's skeleton has at most
+        short_skeleton_length consonants, and not at all if it has fewer than min_skeleton_length.
+        Words that only match on their skeletons are ranked after all full-form matches, as the two distances are not
+        comparable
+        :param token: the (unnormalized) token
+        :return: list of (word, distance, on_skeleton) tuples, full-form matches first, each by ascending distance
+        """
+
+        distance = self.max_distance
+
+        if len(token) <= self.short_token_length:
+            distance = min(distance, 1)
+
+        # Shared deletion variants only bound the distance from above by twice the distance, so it is verified
+        full_form = {}
+
+        for variant in self.deletes(token, distance):
+            for word in self.word_deletes.get(variant, ()):
+                if word not in full_form:
+                    full_form[word] = self.levenshtein_distance(token, word)
+
+        full_form = dict([(word, d) for (word, d) in full_form.items() if d <= distance])
+
+        on_skeleton = {}
+        skeleton = self.replace_vowels(token)
+
+        skeleton_distance = self.skeleton_distance
+
+        if len(skeleton) <= self.short_skeleton_length:
+            skeleton_distance = 0
+
+        if len(skeleton) >= self.min_skeleton_length:
+            for variant in self.deletes(skeleton, skeleton_distance):
+                for word in self.skeleton_deletes.get(variant, ()):
+                    if word not in full_form and word not in on_skeleton:
+                        on_skeleton[word] = self.levenshtein_distance(skeleton, self.replace_vowels(word))
+
+        on_skeleton = dict([(word, d) for (word, d) in on_skeleton.items() if d <= skeleton_distance])
+
+        return sorted([(word, d, False) for (word, d) in full_form.items()], key=lambda x: x[1]) + \
+            sorted([(word, d, True) for (word, d) in on_skeleton.items()], key=lambda x: x[1])
+
+    def levenshtein_distance(self, word1, word2):
+
+        """
+        Measures Levenshtein-Distance between two words, keeping only two rows of the matrix
+        :param word1: first word
+        :param word2: second word
+        :return: Levenshtein-Distance between word1 and word2
+        """
+
+        previous = list(range(len(word2) + 1))
+
+        for i in range(1, len(word1) + 1):
+
+            current = [i] + [0] * len(word2)
+
+            for j in range(1, len(word2) + 1):
+
+                substitution = 0
+
+                if word1[i - 1] != word2[j - 1]:
+                    substitution = 1
+
+                current[j] = min(previous[j] + 1,
+                                 current[j - 1] + 1,
+                                 previous[j - 1] + substitution)
+
+            previous = current
+
+        return previous[len(word2)]
+
+    def replace_vowels(self, word):
+
+        """
+        Reduces a word to its consonant skeleton; has to stay consistent with Lookup.replace_vowels
+        :param word: the string of the word to be reduced
+        :return: the consonant skeleton of word
+        """
+
+        word = word.replace("a", "")
+        word = word.replace("e", "")
+        word = word.replace("i", "")
+        word = word.replace("o", "")
+        word = word.replace("u", "")
+        word = word.replace("y", "")
+
+        return word
@@ -7,6 +7,8 @@ import numpy as np
 import math
 import codecs
 import pickle
+import time
+from DeletionIndex import DeletionIndex
 """
 Normalizes a given json file
 """
@@ -28,10 +30,35 @@ class Normalization:
 
     # Numeral to character replacement
     num_to_letter = {"0": "O", "1": "o", "2": "t", "3": "t", "4": "f", "5": "f", "6": "s", "7": "s", "8": "e", "9": "n"}
+
+    # Numeral to sound replacement for tokens like '2day' or 'l8r' before they are looked up in the deletion index
+    num_to_sound = {"0": "o", "1": "one", "2": "to", "3": "three", "4": "for", "5": "five", "6": "six", "7": "seven",
+                    "8": "ate", "9": "nine"}
     to_be_normalized = ""
     normalized = ""
 
-    def __init__(self, ngram_counts, word_list, lookup, n, to_be_normalized, normalized):
+    # Anytime mode: time budget per tweet in seconds and maximal number of scored candidates per token
+    time_budget = None
+    max_candidates = None
+
+    # Words ranked by their unigram frequency, per first letter and for the whole vocabulary
+    ranked_word_list = {}
+    ranked_vocabulary = []
+    vocabulary = set()
+
+    # Optional deletion index over word_list for tokens that do not occur in the lookup, and the number of its
+    # candidates that are scored per token
+    max_edit_distance = None
+    max_edit_candidates = 10
+    deletion_index = None
+
+    # Number of tokens - other than user names and hashtags - kept unnormalized because the time budget of their tweet
+    # ran out before or while they were scored
+    budget_fallbacks = 0
+    tokens_seen = 0
+
+    def __init__(self, ngram_counts, word_list, lookup, n, to_be_normalized, normalized, time_budget=None,
+                 max_candidates=None, max_edit_distance=None, max_edit_candidates=10):
 
         """
         Initialization
@@ -41,6 +68,13 @@ class Normalization:
         :param n: order of the n-gram model
         :param to_be_normalized: path to the json-file with unnormalized data
         :param normalized: path to the destination of the json-file with normalized data
+        :param time_budget: optional time budget per tweet in seconds; once it is exceeded, tokens are kept as they are
+        :param max_candidates: optional maximal number of candidates scored per token, the most promising ones first:
+        lookup candidates by lexical similarity, word-list candidates by unigram frequency and deletion-index
+        candidates by edit distance
+        :param max_edit_distance: optional maximal edit distance of candidates for tokens that occur neither in the
+        lookup nor in the word list; without it, such tokens get no candidates
+        :param max_edit_candidates: maximal number of these candidates scored per token, the closest ones first
         """
         self.ngram_counts = pickle.load(open(ngram_counts, 'rb'))
         print("Ngrams read...")
@@ -53,9 +87,20 @@ class Normalization:
         self.n = n
         self.to_be_normalized = to_be_normalized
         self.normalized = normalized
+        self.time_budget = time_budget
+        self.max_candidates = max_candidates
+        self.max_edit_distance = max_edit_distance
+        self.max_edit_candidates = max_edit_candidates
+
+        if self.max_edit_distance is not None:
+            self.deletion_index = DeletionIndex(self.word_list, self.max_edit_distance)
+            print("Deletion index built.")
+
         print("\n")
 
         self.initialize_kn_constants()
+        self.rank_word_list()
+        self.vocabulary = set(self.ranked_vocabulary)
         self.normalize()
 
     def initialize_kn_constants(self):
@@ -87,6 +132,80 @@ class Normalization:
         self.D1 = 2 - (3 * y * n3 / n2)
         self.D3 = 3 - (4 * y * n4 / n3)
 
+    def unigram_count(self, word):
+
+        """
+        Returns the raw unigram count of a word, i.e. its count with the empty history
+        :param word: the word whose count is returned
+        :return: the unigram count of word
+        """
+
+        if word in self.ngram_counts and "" in self.ngram_counts[word]:
+            return self.ngram_counts[word][""]
+
+        return 0.0
+
+    def rank_word_list(self):
+
+        """
+        Sorts the words of each first letter and of the whole vocabulary by descending unigram frequency, such that
+        the most promising candidates are scored first in anytime mode
+        """
+
+        if self.time_budget is None and self.max_candidates is None:
+            self.ranked_word_list = self.word_list
+            self.ranked_vocabulary = [word for key in self.word_list for word in self.word_list[key]]
+            return
+
+        self.ranked_word_list = {}
+
+        for key in self.word_list:
+            self.ranked_word_list[key] = sorted(self.word_list[key], key=self.unigram_count, reverse=True)
+
+        self.ranked_vocabulary = sorted([word for key in self.word_list for word in self.word_list[key]],
+                                        key=self.unigram_count, reverse=True)
+
+    def out_of_time(self, deadline):
+
+        """
+        Checks whether the time budget of the current tweet is used up
+        :param deadline: point in time until which the current tweet has to be normalized, None if unbounded
+        :return: True if the deadline has passed, else False
+        """
+
+        return deadline is not None and time.monotonic() > deadline
+
+    def best_candidate(self, candidates, history, deadline):
+
+        """
+        Scores the candidates in the given order and returns the most probable one.
+        Scoring stops after max_candidates candidates or as soon as the deadline has passed
+        :param candidates: list of candidate words, the most promising ones first
+        :param history: the sequence of words preceding the candidates
+        :param deadline: point in time until which the current tweet has to be normalized, None if unbounded
+        :return: the most probable candidate, its probability - ("", 0.0) if none was scored - and whether scoring was
+        cut short by the deadline
+        """
+
+        max_prob = 0.0
+        max_prob_word = ""
+
+        for scored, candidate in enumerate(candidates):
+
+            if self.max_candidates is not None and scored >= self.max_candidates:
+                break
+
+            if self.out_of_time(deadline):
+                return max_prob_word, max_prob, True
+
+            prob = self.pkn(candidate, ' '.join(history[:]))
+
+            if prob > max_prob:
+                max_prob = prob
+                max_prob_word = candidate
+
+        return max_prob_word, max_prob, False
+
     def pkn(self, current_word, history):
 
         """
@@ -161,11 +280,29 @@ class Normalization:
 
             normalized_text = []
 
+            deadline = None
+
+            if self.time_budget is not None:
+                deadline = time.monotonic() + self.time_budget
+
             for word in unnormalized_text:
 
                 # If the word is not a user name
                 if not (word.startswith("@") or word.startswith("#")):
 
+                    self.tokens_seen += 1
+
+                    # If the time budget of the tweet is used up, the word is kept as it is
+                    if self.out_of_time(deadline):
+                        self.budget_fallbacks += 1
+                        normalized_text.append(word)
+                        history.append(word)
+                        history = history[1:]
+                        continue
+
+                    # Whether the scoring of any candidate list was cut short by the deadline
+                    truncated = False
+
                     multiword = []
                     multiword_prob = 1.0
 
@@ -181,28 +318,17 @@ class Normalization:
                             if char.isdigit():
                                 letter = self.num_to_letter[char]
 
-                                max_prob = 0.0
-                                max_prob_word = ""
-
-
-                                if letter in self.word_list:
-                                    for possible_word in self.word_list[letter]:
-                                        prob = self.pkn(possible_word, ' '.join(alt_history[:]))
-
-                                        if prob > max_prob:
-                                            max_prob = prob
-                                            max_prob_word = possible_word
+                                if letter in self.ranked_word_list:
+                                    possible_words = self.ranked_word_list[letter]
 
                                 # If no word starts with the character - e.g. in case the 'letter' is a hyphen -
                                 # All words are taken into account
                                 else:
-                                    for key in self.word_list:
-                                        for possible_word in self.word_list[key]:
-                                            prob = self.pkn(possible_word, ' '.join(alt_history[:]))
+                                    possible_words = self.ranked_vocabulary
 
-                                            if prob > max_prob:
-                                                max_prob = prob
-                                                max_prob_word = possible_word
+                                max_prob_word, max_prob, cut = self.best_candidate(possible_words, alt_history,
+                                                                                   deadline)
+                                truncated = truncated or cut
 
                                 multiword_prob *= max_prob
                                 multiword.append(max_prob_word)
@@ -210,9 +336,6 @@ class Normalization:
                                 alt_history = alt_history[1:]
                                 alt_history.append(max_prob_word)
 
-                    one_word_prob = self.pkn(word, ' '.join(history[:]))
-                    one_word = word
-
                     candidate = ""
                     candidate_prob = 0.0
 
@@ -221,14 +344,42 @@ class Normalization:
 
                         candidates = self.lookup[word]
 
-                        for (can, sim) in candidates:
+                        # In anytime mode, the candidates with the highest lexical similarity are scored first
+                        if self.time_budget is not None or self.max_candidates is not None:
+                            candidates = sorted(candidates, key=lambda x: x[1], reverse=True)
+
+                        candidate, candidate_prob, cut = self.best_candidate([can for (can, sim) in candidates if can],
+                                                                             history, deadline)
+                        truncated = truncated or cut
 
-                            if can:
-                                prob = self.pkn(can, ' '.join(history[:]))
+                    # Otherwise, if the deletion index is used and the word is neither in the vocabulary nor a number
+                    # or punctuation, the vocabulary words close to it are candidates. Numerals are first replaced by
+                    # their sound.
+                    # Full-form matches precede skeleton matches, then the closest and most frequent ones come first
+                    elif self.deletion_index is not None and word not in self.vocabulary and word.isalnum() \
+                            and not word.isdigit():
 
-                                if prob > candidate_prob:
-                                    candidate_prob = prob
-                                    candidate = can
+                        query = ''.join([self.num_to_sound.get(char, char) for char in word])
+
+                        candidates = [can for (can, distance, on_skeleton) in
+                                      sorted(self.deletion_index.candidates(query),
+                                             key=lambda x: (x[2], x[1], -self.unigram_count(x[0])))]
+
+                        candidate, candidate_prob, cut = self.best_candidate(candidates[:self.max_edit_candidates],
+                                                                             history, deadline)
+                        truncated = truncated or cut
+
+                    # If the deadline cut the scoring short before any candidate or complete multi-word was found,
+                    # the word is kept without scoring it as well
+                    if truncated and not candidate and (not multiword or "" in multiword):
+                        self.budget_fallbacks += 1
+                        normalized_text.append(word)
+                        history.append(word)
+                        history = history[1:]
+                        continue
+
+                    one_word_prob = self.pkn(word, ' '.join(history[:]))
+                    one_word = word
 
                     if not multiword:
                         multiword_prob = 0.0
@@ -239,6 +390,11 @@ class Normalization:
                     largest = max(one_word_prob, multiword_prob, candidate_prob)
 
                     if largest == one_word_prob:
+
+                        # The word is kept because its candidates could not all be scored in time
+                        if truncated:
+                            self.budget_fallbacks += 1
+
                         normalized_text.append(one_word)
                         history.append(word)
                         history = history[1:]
@@ -264,6 +420,10 @@ class Normalization:
             with open(self.normalized, 'w') as outfile:
                 json.dump(data, outfile)
 
+        if self.time_budget is not None:
+            print("Time budget exceeded: " + str(self.budget_fallbacks) + " of " + str(self.tokens_seen) +
+                  " tokens kept unnormalized.")
+
 Normalization("/path/to/n-gram-counts.p",
               "/path/to/word_list.p",
               "/path/to/lookup.p", n,